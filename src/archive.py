@@ -0,0 +1,48 @@
+import argparse
+import logging
+from config import DATABASE_URL, ARCHIVE_AFTER_DAYS
+from models.base import init_db
+from utils.archive_utils import archive_messages, restore_messages
+
+# 配置日志
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """归档/恢复消息的命令行工具
+
+    用法：
+        python src/archive.py archive [--days 天数]
+        python src/archive.py restore [--user 用户ID]
+    """
+    parser = argparse.ArgumentParser(description="消息冷热分层归档工具")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    archive_parser = subparsers.add_parser("archive", help="归档旧消息")
+    archive_parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="归档早于该天数的消息")
+
+    restore_parser = subparsers.add_parser("restore", help="恢复归档消息")
+    restore_parser.add_argument("--user", type=int, default=None, help="只恢复指定用户的消息")
+
+    args = parser.parse_args()
+
+    engine, session_maker = init_db(DATABASE_URL)
+    try:
+        if args.action == "archive":
+            if args.days <= 0:
+                parser.error("归档天数必须大于 0")
+            count = archive_messages(session_maker, args.days)
+            logger.info(f"共归档 {count} 条消息")
+        else:
+            count = restore_messages(session_maker, args.user)
+            logger.info(f"共恢复 {count} 条消息")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
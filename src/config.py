@@ -16,4 +16,40 @@ BEIFEN_CHAT_ID = int(os.getenv('BEIFEN_CHAT_ID', 0))
 # 每页显示的消息数量
 MESSAGES_PER_PAGE = 10 
 
-PROXY=os.getenv('PROXY', '')
\ No newline at end of file
+PROXY=os.getenv('PROXY', '')
+
+# Bot API 地址，为空时使用官方地址，例如 http://127.0.0.1:8081/bot
+BOT_API_BASE_URL = os.getenv('BOT_API_BASE_URL', '')
+
+# 管理员的 Telegram ID，多个以逗号分隔
+ADMIN_IDS = [int(i) for i in os.getenv('ADMIN_IDS', '').split(',') if i.strip()]
+
+# jieba 自定义词典路径
+JIEBA_USER_DICT = os.getenv('JIEBA_USER_DICT', '')
+
+# /reindex 命令使用的分词进程数，默认保留一个 CPU 核处理在线请求
+REINDEX_WORKERS = int(os.getenv('REINDEX_WORKERS', max((os.cpu_count() or 1) - 1, 1)))
+
+# 两次拉取更新之间的间隔（秒）
+POLL_INTERVAL = float(os.getenv('POLL_INTERVAL', 1.0))
+
+# 全局同时处理的最大更新数
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', 16))
+
+# 慢查询阈值（毫秒），0 表示不记录
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+
+# 慢查询日志文件，为空时只输出到标准日志
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', '')
+
+# 性能分析结果的保存目录
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+
+# 收到 SIGUSR1 信号时性能分析的持续时间（秒）
+PROFILE_SIGNAL_SECONDS = float(os.getenv('PROFILE_SIGNAL_SECONDS', 30))
+
+# 冷热分层：超过该天数的消息归档到冷存储，0 表示不归档
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+
+# 归档任务执行间隔（小时）
+ARCHIVE_INTERVAL_HOURS = float(os.getenv('ARCHIVE_INTERVAL_HOURS', 24))
\ No newline at end of file
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+from telegram import Update
+from telegram.ext import ContextTypes
+from config import ADMIN_IDS, REINDEX_WORKERS
+from utils.reindex_utils import reindex_messages
+
+logger = logging.getLogger(__name__)
+
+# 重新分词任务的进度刷新间隔（秒）
+REINDEX_REPORT_INTERVAL = 10
+
+# /profile 默认分析的更新数量
+DEFAULT_PROFILE_UPDATES = 100
+
+
+def is_admin(user_id: int) -> bool:
+    """检查用户是否为管理员"""
+    return user_id in ADMIN_IDS
+
+
+async def reindex_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """处理 /reindex 命令，使用当前分词规则重新生成所有消息的分词
+
+    用法：
+        /reindex           # 从上次的检查点继续
+        /reindex restart   # 从头开始
+    """
+    user = update.effective_user
+    if not is_admin(user.id):
+        await update.message.reply_text("❌ 仅管理员可以使用此命令！")
+        return
+
+    if context.bot_data.get("reindex_running"):
+        await update.message.reply_text("⏳ 重新分词任务正在运行中")
+        return
+
+    restart = bool(context.args) and context.args[0] == "restart"
+    status_message = await update.message.reply_text("⏳ 重新分词任务已开始...")
+
+    # 任务在后台运行，不阻塞该管理员的后续更新
+    context.bot_data["reindex_running"] = True
+    context.application.create_task(_run_reindex(context, status_message, user.id, restart))
+
+
+async def _run_reindex(context: ContextTypes.DEFAULT_TYPE, status_message, user_id: int, restart: bool):
+    """在工作线程中运行重新分词任务，并定期汇报进度"""
+    sessionmaker = context.bot_data["db_session"]
+
+    # 进度在工作线程中更新，由当前协程定期汇报
+    state = {"progress": None}
+
+    def on_progress(progress):
+        state["progress"] = progress
+
+    try:
+        # 限制进程数，避免占满 CPU 影响在线请求；
+        # 机器人进程是多线程的，使用 spawn 创建进程，不从当前进程 fork
+        task = asyncio.create_task(asyncio.to_thread(
+            reindex_messages, sessionmaker, restart=restart, workers=REINDEX_WORKERS,
+            progress_callback=on_progress, mp_context=multiprocessing.get_context("spawn")
+        ))
+        last_text = None
+        while not task.done():
+            await asyncio.wait({task}, timeout=REINDEX_REPORT_INTERVAL)
+            progress = state["progress"]
+            if progress and not task.done():
+                text = f"⏳ 重新分词中\n{progress}"
+                if text != last_text:
+                    try:
+                        await status_message.edit_text(text)
+                        last_text = text
+                    except Exception as e:
+                        logger.warning(f"更新重新分词进度失败: {e}")
+
+        count = task.result()
+        await status_message.edit_text(f"✅ 重新分词完成，共处理 {count} 条消息")
+        logger.info(f"管理员 {user_id} 完成重新分词，共处理 {count} 条消息")
+    except Exception as e:
+        logger.error(f"重新分词失败: {e}")
+        await status_message.edit_text(f"❌ 重新分词失败：{e}\n再次执行 /reindex 将从检查点继续")
+    finally:
+        context.bot_data["reindex_running"] = False
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """处理 /profile 命令，对接下来的更新进行性能分析
+
+    用法：
+        /profile         # 分析接下来的 100 个更新
+        /profile 500     # 分析接下来的 500 个更新
+        /profile 30s     # 分析接下来的 30 秒
+        /profile stop    # 立即停止并保存结果
+    """
+    user = update.effective_user
+    if not is_admin(user.id):
+        await update.message.reply_text("❌ 仅管理员可以使用此命令！")
+        return
+
+    profiler = context.bot_data["profiler"]
+    arg = context.args[0].lower() if context.args else ""
+
+    if arg == "stop":
+        if not profiler.running:
+            await update.message.reply_text("❌ 性能分析未在运行")
+            return
+        # 结果由 on_finish 回调发送
+        profiler.stop()
+        return
+
+    updates, seconds = None, None
+    try:
+        if arg.endswith("s"):
+            seconds = float(arg[:-1])
+        else:
+            updates = int(arg) if arg else DEFAULT_PROFILE_UPDATES
+        # 非正数或无穷大会导致分析永远不会停止
+        limit = seconds if seconds is not None else updates
+        if not 0 < limit < math.inf:
+            raise ValueError(arg)
+    except ValueError:
+        await update.message.reply_text("❌ 参数错误，用法：/profile [更新数|秒数s|stop]")
+        return
+
+    chat_id = update.effective_chat.id
+
+    async def on_finish(path):
+        await context.bot.send_message(chat_id, f"✅ 性能分析已完成\n结果：{path}\n摘要：{path.with_suffix('.txt')}")
+
+    # 不统计 /profile 命令本身
+    if not profiler.start(updates=updates, seconds=seconds, on_finish=on_finish,
+                          after_update_id=update.update_id):
+        await update.message.reply_text("⏳ 性能分析正在运行中")
+        return
+
+    target = f"{seconds:g} 秒" if seconds else f"{updates} 个更新"
+    await update.message.reply_text(f"⏳ 性能分析已开始，将分析接下来的 {target}")
@@ -2,13 +2,17 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, func
-from models.models import User, Message
+from models.models import User, Message, ArchivedMessage
+from utils.archive_utils import get_archived_stats
 from datetime import datetime
 import logging
 from config import BEIFEN_CHAT_ID
 
 logger = logging.getLogger(__name__)
 
+# 注销时每批读取的消息数量
+UNREGISTER_BATCH_SIZE = 500
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """处理 /start 命令"""
@@ -20,6 +24,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /register   - 注册
 /unregister - 注销
 /search     - 搜索已备份的消息
+              支持 type:photo after:2024-01-01 before:2024-02-01 has:file 过滤
 /me         - 查看个人信息统计
 
 使用方法：
@@ -65,56 +70,79 @@ async def unregister_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user = update.effective_user
 
     try:
-        with sessionmaker.begin() as session:
+        with sessionmaker() as session:
             # 检查用户是否已注册
             result = session.execute(
-                select(User).where(User.telegram_id == user.id)
+                select(User.id).where(User.telegram_id == user.id)
             )
             existing_user = result.scalar_one_or_none()
 
-            if not existing_user:
-                await update.message.reply_text("❌ 您还没有注册！")
-                return
+            # 统计用户的备份消息数量
+            total_count = 0
+            for model in (Message, ArchivedMessage):
+                total_count += session.execute(
+                    select(func.count(model.id)).where(model.user_id == user.id)
+                ).scalar()
 
-            # 获取用户的所有备份消息
-            messages_result = session.execute(
-                select(Message).where(Message.user_id == user.id)
-            )
-            messages = messages_result.scalars().all()
-
-            # 删除频道中的消息
-            deleted_count = 0
-            failed_count = 0
-            if BEIFEN_CHAT_ID:
-                for msg in messages:
-                    if msg.forwarded_message_id:
+        if not existing_user:
+            await update.message.reply_text("❌ 您还没有注册！")
+            return
+
+        # 删除频道中的消息
+        # 按主键分批读取转发消息ID，每批读取完立即结束查询，
+        # 调用 Bot API 期间不持有游标和事务，避免阻塞其他用户的写入
+        deleted_count = 0
+        failed_count = 0
+        if BEIFEN_CHAT_ID:
+            for model in (Message, ArchivedMessage):
+                last_id = 0
+                while True:
+                    with sessionmaker() as session:
+                        rows = session.execute(
+                            select(model.id, model.forwarded_message_id)
+                            .where(model.user_id == user.id)
+                            .where(model.forwarded_message_id.isnot(None))
+                            .where(model.id > last_id)
+                            .order_by(model.id)
+                            .limit(UNREGISTER_BATCH_SIZE)
+                        ).all()
+
+                    if not rows:
+                        break
+                    last_id = rows[-1].id
+
+                    for row in rows:
                         try:
                             await context.bot.delete_message(
                                 chat_id=BEIFEN_CHAT_ID,
-                                message_id=msg.forwarded_message_id
+                                message_id=row.forwarded_message_id
                             )
                             deleted_count += 1
                         except Exception as e:
-                            logger.warning(f"删除频道消息失败 (message_id: {msg.forwarded_message_id}): {e}")
+                            logger.warning(f"删除频道消息失败 (message_id: {row.forwarded_message_id}): {e}")
                             failed_count += 1
 
-            # 删除用户的所有备份消息
+        # 在单独的短事务中删除用户的所有备份消息和用户
+        with sessionmaker.begin() as session:
             session.execute(
                 delete(Message).where(Message.user_id == user.id)
             )
-
-            # 删除用户
-            session.delete(existing_user)
+            session.execute(
+                delete(ArchivedMessage).where(ArchivedMessage.user_id == user.id)
+            )
+            session.execute(
+                delete(User).where(User.telegram_id == user.id)
+            )
 
         # 发送注销成功消息
         status_text = f"✅ 注销成功！\n\n"
         status_text += f"📊 统计信息：\n"
-        status_text += f"- 总备份消息数：{len(messages)}\n"
+        status_text += f"- 总备份消息数：{total_count}\n"
         if BEIFEN_CHAT_ID:
             status_text += f"- 频道消息删除：{deleted_count} 成功，{failed_count} 失败\n"
 
         await update.message.reply_text(status_text)
-        logger.info(f"用户 {user.id} 注销成功，删除了 {len(messages)} 条备份消息")
+        logger.info(f"用户 {user.id} 注销成功，删除了 {total_count} 条备份消息")
 
     except Exception as e:
         error_msg = f"❌ 注销过程中发生错误：{str(e)}"
@@ -138,35 +166,31 @@ async def me_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ 您还没有注册！请先使用 /register 命令注册。")
             return
 
-        # 获取消息统计
-        total_count = session.execute(
-            select(func.count(Message.id)).where(Message.user_id == user.id)
-        ).scalar()
-
         # 获取各类型消息数量
-        type_counts = {}
-        for msg_type in ["text", "photo", "video", "document", "voice"]:
-            count = session.execute(
-                select(func.count(Message.id))
-                .where(Message.user_id == user.id)
-                .where(Message.message_type == msg_type)
-            ).scalar()
-            type_counts[msg_type] = count
+        counts = dict(session.execute(
+            select(Message.message_type, func.count(Message.id))
+            .where(Message.user_id == user.id)
+            .group_by(Message.message_type)
+        ).all())
 
         # 获取最早和最新的消息时间
-        first_message = session.execute(
-            select(Message)
+        first_at, last_at = session.execute(
+            select(func.min(Message.created_at), func.max(Message.created_at))
             .where(Message.user_id == user.id)
-            .order_by(Message.created_at.asc())
-            .limit(1)
-        ).scalar_one_or_none()
+        ).one()
 
-        last_message = session.execute(
-            select(Message)
-            .where(Message.user_id == user.id)
-            .order_by(Message.created_at.desc())
-            .limit(1)
-        ).scalar_one_or_none()
+        # 合并归档消息的统计
+        archived_counts, archived_first_at, archived_last_at = get_archived_stats(session, user.id)
+
+    type_counts = {}
+    for msg_type in ["text", "photo", "video", "document", "voice"]:
+        type_counts[msg_type] = counts.get(msg_type, 0) + archived_counts.get(msg_type, 0)
+    total_count = sum(counts.values()) + sum(archived_counts.values())
+
+    if archived_first_at and (not first_at or archived_first_at < first_at):
+        first_at = archived_first_at
+    if archived_last_at and (not last_at or archived_last_at > last_at):
+        last_at = archived_last_at
 
     # 构建用户信息显示
     user_info = f"👤 <b>用户信息</b>\n"
@@ -199,10 +223,10 @@ async def me_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     stats += f"\n<b>总计消息数</b>: <code>{total_count}</code>\n\n"
 
     # 添加时间范围信息
-    if first_message and last_message:
+    if first_at and last_at:
         time_range = "⏰ <b>时间范围</b>\n"
-        time_range += f"├ 最早消息: <code>{first_message.created_at.strftime('%Y-%m-%d %H:%M:%S')}</code>\n"
-        time_range += f"└ 最新消息: <code>{last_message.created_at.strftime('%Y-%m-%d %H:%M:%S')}</code>"
+        time_range += f"├ 最早消息: <code>{first_at.strftime('%Y-%m-%d %H:%M:%S')}</code>\n"
+        time_range += f"└ 最新消息: <code>{last_at.strftime('%Y-%m-%d %H:%M:%S')}</code>"
     else:
         time_range = "⏰ <b>时间范围</b>\n└ 暂无消息记录"
 
@@ -1,11 +1,12 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from sqlalchemy import select, or_, func
-from models.models import Message
+from sqlalchemy import select, delete, func, case
+from models.models import Message, ArchivedMessage
 from config import MESSAGES_PER_PAGE, BEIFEN_CHAT_ID
 from utils import bot_utils
-from utils.text_utils import tokenize_text
+from utils.archive_utils import decompress_text, PREVIEW_LENGTH, PREVIEW_SOURCE_LENGTH
+from utils.query_utils import SearchQuery, parse_search_query, build_search_conditions
 logger = logging.getLogger(__name__)
 # 会话状态
 SEARCHING = 1
@@ -14,41 +15,58 @@ SEARCHING = 1
 async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """处理 /search 命令
 
-    用法：/search [关键词]
+    用法：/search [关键词] [过滤条件]
     示例：
-        /search          # 显示最近的消息
-        /search 关键词   # 搜索包含关键词的消息
+        /search                          # 显示最近的消息
+        /search 关键词                   # 搜索包含关键词的消息
+        /search type:photo 关键词        # 只搜索图片消息
+        /search after:2024-03-01 before:2024-04-01   # 按时间范围过滤
+        /search has:file                 # 只显示带文件的消息
     """
     # 获取页码，默认为第1页
     page = 1
 
-    # 保存搜索词到 context
     query = " ".join(context.args) if context.args else ""
-    context.user_data['search_query'] = query
 
-    await show_search_results(update, context, page, query, is_new_search=True)
+    # 解析过滤条件
+    try:
+        parsed = parse_search_query(query)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ 搜索条件错误：{e}")
+        return
 
+    # 保存解析后的搜索条件到 context，翻页时直接使用
+    context.user_data['search_query'] = parsed
+
+    await show_search_results(update, context, page, parsed, is_new_search=True)
 
-async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int, query: str, is_new_search: bool = False):
-    """显示搜索结果的分页内容"""
-    sessionmaker = context.bot_data["db_session"]
-    user_id = update.effective_user.id if is_new_search else update.callback_query.from_user.id
 
-    # 构建基础查询
-    stmt = select(Message).where(Message.user_id == user_id)
+async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE, page: int, query: SearchQuery, is_new_search: bool = False, archived: bool = False):
+    """显示搜索结果的分页内容
 
-    # 如果有搜索关键词，添加关键词过滤
-    if query:
-        search_tokens = tokenize_text(query)
-        search_words = search_tokens.split()
-        conditions = []
-        for word in search_words:
-            conditions.append(Message.tokens.contains(word))
-        stmt = stmt.where(or_(*conditions))
+    默认只查询热存储，archived 为 True 时查询归档的冷存储
+    """
+    sessionmaker = context.bot_data["db_session"]
+    user_id = update.effective_user.id if is_new_search else update.callback_query.from_user.id
+    model = ArchivedMessage if archived else Message
+    # 归档消息的回调数据使用 a 前缀区分
+    prefix = "a" if archived else ""
+
+    # 只查询渲染列表需要的列，预览文本在 SQL 中截断
+    columns = [model.id, model.message_type, model.created_at]
+    if archived:
+        # 归档消息使用归档时保存的预览；旧版本归档的消息没有预览，只对这些行读取压缩文本
+        columns += [model.preview, case((model.preview.is_(None), model.text_data)).label("text_data")]
+    else:
+        columns.append(func.substr(model.text, 1, PREVIEW_SOURCE_LENGTH).label("preview"))
+
+    # 添加过滤条件和关键词匹配
+    conditions = [model.user_id == user_id] + build_search_conditions(model, query)
+    stmt = select(*columns).where(*conditions)
 
     # 计算总记录数
     with sessionmaker.begin() as session:
-        count_stmt = select(func.count()).select_from(stmt)
+        count_stmt = select(func.count(model.id)).where(*conditions)
         total_count = session.execute(count_stmt).scalar()
 
         # 计算总页数
@@ -59,19 +77,26 @@ async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE
 
         # 添加分页
         offset = (page - 1) * MESSAGES_PER_PAGE
-        stmt = stmt.order_by(Message.created_at.desc())
+        stmt = stmt.order_by(model.created_at.desc())
         stmt = stmt.offset(offset).limit(MESSAGES_PER_PAGE)
 
         # 执行查询
         result = session.execute(stmt)
-        messages = result.scalars().all()
+        messages = result.all()
+
+    # 热存储的最后一页提供按需搜索归档消息的入口
+    archive_button = None
+    if not archived and page >= total_pages:
+        archive_button = InlineKeyboardButton("🗄 搜索归档消息", callback_data="apage_1")
 
     if not messages:
-        text = "未找到任何消息！" if not query else f"未找到包含关键词 '{query}' 的消息！"
+        scope = "归档消息" if archived else "消息"
+        text = f"未找到任何{scope}！" if not query.text else f"未找到符合搜索条件 '{query.text}' 的{scope}！"
+        reply_markup = InlineKeyboardMarkup([[archive_button]]) if archive_button else None
         if is_new_search:
-            await update.message.reply_text(text)
+            await update.message.reply_text(text, reply_markup=reply_markup)
         else:
-            await update.callback_query.edit_message_text(text)
+            await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
         return
 
     # 消息类型图标映射
@@ -83,7 +108,7 @@ async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE
         "voice": "🎤"
     }
 
-    def clean_message_text(text: str, max_length: int = 100) -> str:
+    def clean_message_text(text: str, max_length: int = PREVIEW_LENGTH) -> str:
         """清理和格式化消息文本"""
         if not text:
             return "无文本内容"
@@ -105,7 +130,9 @@ async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE
         return text
 
     # 构建搜索结果显示
-    title = "最近的消息" if not query else f'搜索 "{query}"'
+    title = "最近的消息" if not query.text else f'搜索 "{query.text}"'
+    if archived:
+        title = f"🗄 归档{title}"
     text = f"<b>{title}</b> (第 {page}/{total_pages} 页)\n\n"
 
     # 添加消息列表
@@ -117,7 +144,10 @@ async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE
         time_str = msg.created_at.strftime("%Y-%m-%d %H:%M")
 
         # 处理消息预览
-        preview = clean_message_text(msg.text)
+        preview = msg.preview
+        if archived and preview is None:
+            preview = decompress_text(msg.text_data)
+        preview = clean_message_text(preview)
 
         # 构建消息条目
         text += f"{idx}. {icon} <code>{time_str}</code>\n"
@@ -133,21 +163,24 @@ async def show_search_results(update: Update, context: ContextTypes.DEFAULT_TYPE
     for idx, msg in enumerate(messages, 1):
         # 创建包含查看和删除按钮的行
         row = [
-            InlineKeyboardButton(f"查看 {idx}", callback_data=f"view_{msg.id}"),
-            InlineKeyboardButton(f"删除 {idx}", callback_data=f"delete_{msg.id}")
+            InlineKeyboardButton(f"查看 {idx}", callback_data=f"{prefix}view_{msg.id}"),
+            InlineKeyboardButton(f"删除 {idx}", callback_data=f"{prefix}delete_{msg.id}")
         ]
         keyboard.append(row)
 
     # 添加分页按钮
     nav_buttons = []
     if page > 1:
-        nav_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"page_{page-1}"))
+        nav_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"{prefix}page_{page-1}"))
     if page < total_pages:
-        nav_buttons.append(InlineKeyboardButton("➡️", callback_data=f"page_{page+1}"))
+        nav_buttons.append(InlineKeyboardButton("➡️", callback_data=f"{prefix}page_{page+1}"))
 
     if nav_buttons:
         keyboard.append(nav_buttons)
 
+    if archive_button:
+        keyboard.append([archive_button])
+
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     try:
@@ -173,14 +206,15 @@ async def handle_page_navigation(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
 
-    # 获取目标页码
+    # 获取目标页码，a 前缀表示归档消息
     page = int(query.data.split('_')[1])
+    archived = query.data.startswith('a')
 
     # 获取之前保存的搜索查询
-    search_query = context.user_data.get('search_query', '')
+    search_query = context.user_data.get('search_query') or SearchQuery()
 
     # 显示对应页的搜索结果
-    await show_search_results(update, context, page, search_query, is_new_search=False)
+    await show_search_results(update, context, page, search_query, is_new_search=False, archived=archived)
 
 
 async def handle_message_view(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -189,11 +223,12 @@ async def handle_message_view(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     message_id = int(query.data.split('_')[1])
+    model = ArchivedMessage if query.data.startswith('a') else Message
     sessionmaker = context.bot_data["db_session"]
 
     with sessionmaker.begin() as session:
         result = session.execute(
-            select(Message).where(Message.id == message_id)
+            select(model).where(model.id == message_id)
         )
         message = result.scalar_one_or_none()
 
@@ -201,6 +236,8 @@ async def handle_message_view(update: Update, context: ContextTypes.DEFAULT_TYPE
             await query.message.reply_text("❌ 消息不存在！")
             return
 
+        text = decompress_text(message.text_data) if model is ArchivedMessage else message.text
+
         try:
             # 如果配置了目标群组，尝试从群组转发消息
             if BEIFEN_CHAT_ID and message.forwarded_message_id:
@@ -217,9 +254,9 @@ async def handle_message_view(update: Update, context: ContextTypes.DEFAULT_TYPE
 
             # 如果从频道转发失败或没有配置频道，使用备份的消息内容
             if message.message_type == "text":
-                await query.message.reply_text(message.text)
+                await query.message.reply_text(text)
             elif message.file_id:
-                caption = message.text if message.text else None
+                caption = text if text else None
                 if message.message_type == "photo":
                     await query.message.reply_photo(message.file_id, caption=caption)
                 elif message.message_type == "video":
@@ -239,15 +276,16 @@ async def handle_message_delete(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
 
     message_id = int(query.data.split('_')[1])
+    archived = query.data.startswith('a')
+    model = ArchivedMessage if archived else Message
     sessionmaker = context.bot_data["db_session"]
 
     try:
         with sessionmaker.begin() as session:
-            # 获取消息信息
-            result = session.execute(
-                select(Message).where(Message.id == message_id)
-            )
-            message = result.scalar_one_or_none()
+            # 获取消息信息，只需要转发消息ID
+            message = session.execute(
+                select(model.id, model.forwarded_message_id).where(model.id == message_id)
+            ).one_or_none()
 
             if not message:
                 await query.message.reply_text("❌ 消息不存在！")
@@ -264,15 +302,15 @@ async def handle_message_delete(update: Update, context: ContextTypes.DEFAULT_TY
                     logger.warning(f"删除频道消息失败: {e}")
 
             # 删除数据库中的消息记录
-            session.delete(message)
+            session.execute(delete(model).where(model.id == message_id))
 
         # 发送删除成功消息
         m = await query.message.reply_text("✅ 消息已删除！")
 
         # 刷新搜索结果
-        search_query = context.user_data.get('search_query', '')
+        search_query = context.user_data.get('search_query') or SearchQuery()
         current_page = int(query.message.text.split('第 ')[1].split('/')[0])
-        await show_search_results(update, context, current_page, search_query, is_new_search=False)
+        await show_search_results(update, context, current_page, search_query, is_new_search=False, archived=archived)
 
         await bot_utils.delete_message(m, context)
 
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {
+    "id": 1000000,
+    "is_bot": True,
+    "first_name": "FakeBot",
+    "username": "fake_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False,
+}
+
+# HTTP 状态码对应的原因短语
+REASON_PHRASES = {200: "OK", 429: "Too Many Requests"}
+
+# 不注入限流和延迟的方法
+CONTROL_METHODS = {"getMe", "getUpdates", "deleteWebhook", "setWebhook", "close", "logOut"}
+
+
+class BotCall:
+    """机器人对 Bot API 的一次调用"""
+
+    __slots__ = ("method", "params", "result", "at")
+
+    def __init__(self, method: str, params: dict, result):
+        self.method = method
+        self.params = params
+        self.result = result
+        self.at = time.monotonic()
+
+
+class FakeBotApi:
+    """
+    本地模拟的 Telegram Bot API 服务
+
+    支持 getUpdates、forwardMessage、sendMessage、deleteMessage、editMessageText 等方法，
+    可配置响应延迟，并按概率注入 429 限流错误
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, flood_rate: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+
+        self._server = None
+        self._updates: List[dict] = []
+        self._update_id = 0
+        self._new_update = asyncio.Event()
+        self._polling = asyncio.Event()
+        self._message_ids: Dict[int, int] = defaultdict(int)
+        self._messages: Dict[tuple, dict] = {}
+        self._listeners: Dict[int, asyncio.Queue] = {}
+        self._connections = {}
+
+        # 统计信息
+        self.method_counts: Dict[str, int] = defaultdict(int)
+        self.flood_count = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """启动服务，返回监听端口"""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # 结束正在等待的 getUpdates，并关闭保持中的连接，否则 wait_closed 会一直等待
+            self._new_update.set()
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def wait_polling(self):
+        """等待机器人开始拉取更新"""
+        await self._polling.wait()
+
+    def subscribe(self, chat_id: int) -> asyncio.Queue:
+        """订阅机器人发往指定会话的调用"""
+        queue = self._listeners[chat_id] = asyncio.Queue()
+        return queue
+
+    # ---------- 构造更新 ----------
+
+    def _next_message_id(self, chat_id: int) -> int:
+        self._message_ids[chat_id] += 1
+        return self._message_ids[chat_id]
+
+    def _store_message(self, message: dict) -> dict:
+        self._messages[(message["chat"]["id"], message["message_id"])] = message
+        return message
+
+    def get_message(self, chat_id: int, message_id: int) -> dict:
+        return self._messages.get((chat_id, message_id))
+
+    def push_update(self, **payload) -> int:
+        """加入一条更新，返回更新ID"""
+        self._update_id += 1
+        self._updates.append({"update_id": self._update_id, **payload})
+        self._new_update.set()
+        return self._update_id
+
+    def push_message(self, user: dict, text: str = None, photo: bool = False) -> int:
+        """模拟用户发送消息"""
+        message = {
+            "message_id": self._next_message_id(user["id"]),
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private", "first_name": user["first_name"]},
+            "from": user,
+        }
+        if photo:
+            file_id = f"photo-{user['id']}-{message['message_id']}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 800, "height": 600}]
+            if text:
+                message["caption"] = text
+        else:
+            message["text"] = text
+            if text.startswith("/"):
+                command = text.split()[0]
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        self._store_message(message)
+        return self.push_update(message=message)
+
+    def push_callback(self, user: dict, message: dict, data: str) -> int:
+        """模拟用户点击按钮"""
+        return self.push_update(callback_query={
+            "id": f"{user['id']}-{self._update_id + 1}",
+            "from": user,
+            "chat_instance": str(user["id"]),
+            "message": message,
+            "data": data,
+        })
+
+    # ---------- HTTP 服务 ----------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                status, response = await self._dispatch(path, headers.get("content-type", ""), body)
+                data = json.dumps(response).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASON_PHRASES.get(status, 'Unknown')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"处理请求失败: {e}")
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    @staticmethod
+    def _parse_params(content_type: str, body: bytes) -> dict:
+        if not body:
+            return {}
+        if content_type.startswith("application/json"):
+            return json.loads(body)
+
+        params = {}
+        for key, values in parse_qs(body.decode("utf-8"), keep_blank_values=True).items():
+            value = values[-1]
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+
+    async def _dispatch(self, path: str, content_type: str, body: bytes):
+        # 路径格式：/bot<token>/<method>
+        method = path.rstrip("/").rsplit("/", 1)[-1]
+        params = self._parse_params(content_type, body)
+        self.method_counts[method] += 1
+
+        if method not in CONTROL_METHODS:
+            delay = self.latency + random.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.flood_rate and random.random() < self.flood_rate:
+                self.flood_count += 1
+                return 429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+
+        handler = getattr(self, f"_api_{method}", None)
+        result = await handler(params) if handler else True
+
+        chat_id = params.get("chat_id")
+        if isinstance(chat_id, int) and chat_id in self._listeners:
+            self._listeners[chat_id].put_nowait(BotCall(method, params, result))
+
+        return 200, {"ok": True, "result": result}
+
+    # ---------- Bot API 方法 ----------
+
+    async def _api_getMe(self, params: dict):
+        return BOT_USER
+
+    async def _api_getUpdates(self, params: dict):
+        self._polling.set()
+        offset = params.get("offset") or 0
+        timeout = params.get("timeout") or 0
+
+        # 丢弃已确认的更新
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        limit = params.get("limit") or 100
+        return [u for u in self._updates if u["update_id"] >= offset][:limit]
+
+    def _bot_message(self, chat_id: int, **fields) -> dict:
+        message = {
+            "message_id": self._next_message_id(chat_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+            "from": BOT_USER,
+            **fields,
+        }
+        return self._store_message(message)
+
+    async def _api_sendMessage(self, params: dict):
+        fields = {"text": params.get("text", "")}
+        if params.get("reply_markup"):
+            fields["reply_markup"] = params["reply_markup"]
+        return self._bot_message(params["chat_id"], **fields)
+
+    async def _api_sendPhoto(self, params: dict):
+        file_id = str(params.get("photo"))
+        return self._bot_message(
+            params["chat_id"],
+            photo=[{"file_id": file_id, "file_unique_id": file_id, "width": 800, "height": 600}],
+            caption=params.get("caption")
+        )
+
+    async def _api_forwardMessage(self, params: dict):
+        source = self.get_message(params["from_chat_id"], params["message_id"]) or {}
+        fields = {k: source[k] for k in ("text", "caption", "photo") if k in source}
+        if not fields:
+            fields["text"] = ""
+        return self._bot_message(params["chat_id"], **fields)
+
+    async def _api_editMessageText(self, params: dict):
+        message = self.get_message(params.get("chat_id"), params.get("message_id"))
+        if message is None:
+            return True
+        message["text"] = params.get("text", "")
+        message["edit_date"] = int(time.time())
+        if params.get("reply_markup"):
+            message["reply_markup"] = params["reply_markup"]
+        else:
+            message.pop("reply_markup", None)
+        return message
+
+    async def _api_deleteMessage(self, params: dict):
+        self._messages.pop((params.get("chat_id"), params.get("message_id")), None)
+        return True
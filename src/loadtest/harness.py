@@ -0,0 +1,301 @@
+"""
+端到端压测工具
+
+启动本地模拟的 Bot API 服务，以子进程方式运行机器人并指向该服务，
+以不超过目标速率的速度回放模拟用户会话，最后输出吞吐量和延迟分位数
+
+模拟用户为闭环会话，每一步等待机器人完成上一步后才发送下一条更新，
+因此实际发送速率可能低于目标速率，报告中会同时列出两者
+
+用法（在 src 目录下）：
+    python -m loadtest.harness --users 50 --rate 100 --latency 0.05 --flood-rate 0.01
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List
+from loadtest.fake_bot_api import FakeBotApi, BotCall
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+# 模拟的备份频道ID
+FAKE_CHAT_ID = -1001000000000
+
+# 生成消息内容的词表
+WORDS = ["备份", "消息", "测试", "机器人", "搜索", "图片", "视频", "文档", "天气", "旅行",
+         "python", "telegram", "sqlite", "会议", "笔记", "读书", "电影", "音乐", "工作", "周末"]
+
+
+class RateLimiter:
+    """按目标速率均匀发送更新，并统计实际发送的数量"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.sent = 0
+        self._next = time.monotonic()
+
+    async def wait(self):
+        self.sent += 1
+        if not self.interval:
+            return
+        now = time.monotonic()
+        self._next = max(self._next, now)
+        delay = self._next - now
+        self._next += self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Stats:
+    """收集每类操作的延迟"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.timeouts: Dict[str, int] = defaultdict(int)
+
+    def record(self, action: str, latency: float):
+        self.latencies[action].append(latency)
+
+    @staticmethod
+    def percentile(values: List[float], p: float) -> float:
+        values = sorted(values)
+        index = min(int(round(p / 100 * (len(values) - 1))), len(values) - 1)
+        return values[index]
+
+    def report(self, duration: float, api: FakeBotApi, limiter: RateLimiter) -> str:
+        all_latencies = [v for values in self.latencies.values() for v in values]
+        target = f"{limiter.rate:g} updates/s" if limiter.rate > 0 else "不限速"
+        achieved = limiter.sent / duration if duration > 0 else 0.0
+        lines = [
+            f"持续时间: {duration:.1f}s",
+            f"目标发送速率: {target}，实际发送速率: {achieved:.1f} updates/s",
+            f"完成更新: {len(all_latencies)}，超时: {sum(self.timeouts.values())}",
+            f"吞吐量: {len(all_latencies) / duration:.1f} updates/s" if duration > 0 else "吞吐量: -",
+            f"注入 429: {api.flood_count}",
+        ]
+        if limiter.rate > 0 and achieved < limiter.rate * 0.9:
+            lines.append("注意: 实际发送速率低于目标，模拟用户在等待机器人响应，可增加 --users")
+        lines += [
+            "",
+            f"{'操作':<10}{'数量':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}",
+        ]
+        rows = sorted(self.latencies.items())
+        if all_latencies:
+            rows.append(("total", all_latencies))
+        for action, values in rows:
+            if not values:
+                continue
+            lines.append(
+                f"{action:<10}{len(values):>8}"
+                + "".join(f"{self.percentile(values, p) * 1000:>8.0f}ms" for p in (50, 90, 99))
+                + f"{max(values) * 1000:>8.0f}ms"
+            )
+        lines.append("")
+        lines.append("Bot API 调用: " + ", ".join(f"{m}={c}" for m, c in sorted(api.method_counts.items())))
+        return "\n".join(lines)
+
+
+# ---------- 完成条件 ----------
+
+def _is_text_reply(call: BotCall, *keywords) -> bool:
+    return call.method == "sendMessage" and any(k in call.params.get("text", "") for k in keywords)
+
+
+def ingest_done(call: BotCall) -> bool:
+    return _is_text_reply(call, "已备份", "失败")
+
+
+def search_done(call: BotCall) -> bool:
+    return call.method == "sendMessage" and ("reply_markup" in call.params or "未找到" in call.params.get("text", ""))
+
+
+def page_done(call: BotCall) -> bool:
+    return call.method == "editMessageText"
+
+
+def view_done(call: BotCall) -> bool:
+    return call.method in ("forwardMessage", "sendPhoto", "sendMessage")
+
+
+def delete_done(call: BotCall) -> bool:
+    return call.method == "deleteMessage" or _is_text_reply(call, "失败", "不存在")
+
+
+def me_done(call: BotCall) -> bool:
+    return _is_text_reply(call, "消息统计", "未注册")
+
+
+class VirtualUser:
+    """按脚本回放的模拟用户会话"""
+
+    def __init__(self, user_id: int, api: FakeBotApi, limiter: RateLimiter, stats: Stats, timeout: float):
+        self.user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "username": f"user{user_id}"}
+        self.api = api
+        self.limiter = limiter
+        self.stats = stats
+        self.timeout = timeout
+        self.calls = api.subscribe(user_id)
+
+    async def _wait_for(self, predicate: Callable[[BotCall], bool]) -> BotCall:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                call = await asyncio.wait_for(self.calls.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if predicate(call):
+                return call
+
+    async def _step(self, action: str, send: Callable[[], int], predicate: Callable[[BotCall], bool]) -> BotCall:
+        await self.limiter.wait()
+        sent_at = time.monotonic()
+        send()
+        call = await self._wait_for(predicate)
+        if call is None:
+            self.stats.timeouts[action] += 1
+        else:
+            self.stats.record(action, call.at - sent_at)
+        return call
+
+    async def ingest_burst(self, size: int):
+        """连续发送多条消息，再依次等待备份完成"""
+        sent = []
+        for _ in range(size):
+            await self.limiter.wait()
+            text = " ".join(random.choices(WORDS, k=random.randint(3, 12)))
+            sent.append(time.monotonic())
+            self.api.push_message(self.user, text, photo=random.random() < 0.3)
+
+        # 同一用户的更新按顺序处理，完成事件与发送顺序一一对应
+        for sent_at in sent:
+            call = await self._wait_for(ingest_done)
+            if call is None:
+                self.stats.timeouts["ingest"] += 1
+            else:
+                self.stats.record("ingest", call.at - sent_at)
+
+    @staticmethod
+    def _buttons(message: dict) -> List[str]:
+        markup = (message or {}).get("reply_markup") or {}
+        return [button.get("callback_data", "") for row in markup.get("inline_keyboard", []) for button in row]
+
+    async def run(self, bursts: int, burst_size: int):
+        for _ in range(bursts):
+            await self.ingest_burst(burst_size)
+
+            # 搜索并翻页
+            call = await self._step(
+                "search",
+                lambda: self.api.push_message(self.user, f"/search {random.choice(WORDS)}"),
+                search_done
+            )
+            if call is None or not isinstance(call.result, dict):
+                continue
+            result = call.result
+
+            if "page_2" in self._buttons(result):
+                call = await self._step(
+                    "page",
+                    lambda: self.api.push_callback(self.user, result, "page_2"),
+                    page_done
+                )
+                if call is not None and isinstance(call.result, dict):
+                    result = call.result
+
+            buttons = self._buttons(result)
+            views = [b for b in buttons if b.startswith("view_")]
+            deletes = [b for b in buttons if b.startswith("delete_")]
+
+            if views:
+                data = random.choice(views)
+                await self._step("view", lambda: self.api.push_callback(self.user, result, data), view_done)
+
+            if deletes:
+                data = random.choice(deletes)
+                await self._step("delete", lambda: self.api.push_callback(self.user, result, data), delete_done)
+
+            await self._step("me", lambda: self.api.push_message(self.user, "/me"), me_done)
+
+
+async def run_load_test(args) -> str:
+    api = FakeBotApi(latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate,
+                     retry_after=args.retry_after)
+    port = await api.start(port=args.port)
+    logger.info(f"模拟 Bot API 已启动: http://127.0.0.1:{port}")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(
+            os.environ,
+            BOT_TOKEN="123456:LOADTEST",
+            BOT_API_BASE_URL=f"http://127.0.0.1:{port}/bot",
+            BEIFEN_CHAT_ID=str(FAKE_CHAT_ID),
+            DATABASE_URL=args.database_url or f"sqlite:///{data_dir}/bot.db",
+            ARCHIVE_AFTER_DAYS="0",
+            # 拉取间隔会叠加到每个更新的延迟上，压测时关闭
+            POLL_INTERVAL="0",
+            PROXY="",
+            PYTHONPATH=str(SRC_DIR),
+        )
+        bot = subprocess.Popen([sys.executable, str(SRC_DIR / "main.py")], env=env)
+        try:
+            await asyncio.wait_for(api.wait_polling(), args.startup_timeout)
+            logger.info("机器人已开始拉取更新，开始回放会话")
+
+            limiter = RateLimiter(args.rate)
+            stats = Stats()
+            users = [
+                VirtualUser(100000 + i, api, limiter, stats, args.timeout)
+                for i in range(args.users)
+            ]
+            started = time.monotonic()
+            await asyncio.gather(*(user.run(args.bursts, args.burst_size) for user in users))
+            duration = time.monotonic() - started
+            return stats.report(duration, api, limiter)
+        finally:
+            bot.terminate()
+            try:
+                bot.wait(10)
+            except subprocess.TimeoutExpired:
+                bot.kill()
+            await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息备份机器人端到端压测")
+    parser.add_argument("--users", type=int, default=20, help="模拟用户数")
+    parser.add_argument("--rate", type=float, default=50, help="目标发送速率上限（updates/s），0 表示不限速")
+    parser.add_argument("--bursts", type=int, default=3, help="每个用户的会话轮数")
+    parser.add_argument("--burst-size", type=int, default=10, help="每轮连续发送的消息数")
+    parser.add_argument("--latency", type=float, default=0.02, help="Bot API 基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Bot API 随机附加延迟上限（秒）")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="注入 429 错误的概率")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 错误的 retry_after 秒数")
+    parser.add_argument("--timeout", type=float, default=30, help="单个更新的超时时间（秒）")
+    parser.add_argument("--startup-timeout", type=float, default=60, help="等待机器人启动的超时时间（秒）")
+    parser.add_argument("--port", type=int, default=0, help="模拟 Bot API 的端口，0 表示随机")
+    parser.add_argument("--database-url", default="", help="数据库地址，默认使用临时目录")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    print(asyncio.run(run_load_test(args)))
+
+
+if __name__ == "__main__":
+    main()
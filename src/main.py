@@ -1,10 +1,18 @@
+import asyncio
 import logging
+import signal
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler
-from config import BOT_TOKEN, DATABASE_URL, PROXY
+from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, TypeHandler
+from config import (BOT_TOKEN, DATABASE_URL, PROXY, BOT_API_BASE_URL, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_HOURS,
+                    MAX_CONCURRENT_UPDATES, POLL_INTERVAL, SLOW_QUERY_THRESHOLD_MS,
+                    SLOW_QUERY_LOG_FILE, PROFILE_DIR, PROFILE_SIGNAL_SECONDS)
 from models.base import init_db
+from utils.archive_utils import archive_loop
+from utils.update_processor import PerUserUpdateProcessor
+from utils.profiling import UpdateProfiler
 from handlers.command_handlers import start_command, register_command, unregister_command, me_command
 from handlers.message_handlers import handle_message
+from handlers.admin_handlers import reindex_command, profile_command
 from handlers.search_handlers import search_command, handle_message_view, handle_page_navigation, handle_message_delete
 
 # 配置日志
@@ -19,6 +27,8 @@ class TelegramBot:
     def __init__(self):
         self.application = None
         self.engine = None
+        self.profiler = UpdateProfiler(PROFILE_DIR)
+        self.archive_task = None
 
     def stop(self):
         """优雅地停止应用程序"""
@@ -34,11 +44,36 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"停止时发生错误: {e}")
 
+    async def post_init(self, application: Application):
+        """应用初始化完成后启动后台任务"""
+        if ARCHIVE_AFTER_DAYS > 0:
+            # 应用此时尚未运行，PTB 不会跟踪通过 create_task 创建的任务，由 post_stop 负责停止
+            self.archive_task = asyncio.create_task(archive_loop(
+                application.bot_data["db_session"],
+                ARCHIVE_AFTER_DAYS,
+                ARCHIVE_INTERVAL_HOURS
+            ))
+
+        # 收到 SIGUSR1 信号时开始/停止性能分析
+        if hasattr(signal, "SIGUSR1"):
+            try:
+                asyncio.get_running_loop().add_signal_handler(
+                    signal.SIGUSR1, self.profiler.toggle, PROFILE_SIGNAL_SECONDS)
+            except NotImplementedError:
+                logger.warning("当前平台不支持信号处理，无法通过 SIGUSR1 开启性能分析")
+
+    async def post_stop(self, application: Application):
+        """应用停止后结束后台任务"""
+        if self.archive_task:
+            self.archive_task.cancel()
+            await asyncio.gather(self.archive_task, return_exceptions=True)
+            self.archive_task = None
+
     def start(self):
         """启动机器人"""
         try:
             # 初始化数据库
-            self.engine, session_maker = init_db(DATABASE_URL)
+            self.engine, session_maker = init_db(DATABASE_URL, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_FILE or None)
 
             # 创建应用
             builder = Application.builder().token(BOT_TOKEN)
@@ -51,12 +86,20 @@ class TelegramBot:
             builder.get_updates_connect_timeout(15.0)
             builder.proxy(PROXY if PROXY else None)
             builder.get_updates_proxy(PROXY if PROXY else None)
+            if BOT_API_BASE_URL:
+                builder.base_url(BOT_API_BASE_URL)
+            builder.post_init(self.post_init)
+            builder.post_stop(self.post_stop)
+
+            # 并发处理不同用户的更新，同一用户的更新保持顺序
+            builder.concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
 
             self.application = builder.build()
 
             # 存储数据库会话工厂和引擎
             self.application.bot_data["db_session"] = session_maker
             self.application.bot_data["engine"] = self.engine
+            self.application.bot_data["profiler"] = self.profiler
 
             # 注册命令处理程序
             self.application.add_handler(CommandHandler("start", start_command))
@@ -65,17 +108,21 @@ class TelegramBot:
             self.application.add_handler(CommandHandler("search", search_command))
             self.application.add_handler(CommandHandler("me", me_command))
 
+            # 注册管理员命令处理程序
+            self.application.add_handler(CommandHandler("reindex", reindex_command))
+            self.application.add_handler(CommandHandler("profile", profile_command))
+
             # 注册消息查看回调处理程序
             self.application.add_handler(CallbackQueryHandler(
-                handle_message_view, pattern=r"^view_\d+$"))
+                handle_message_view, pattern=r"^a?view_\d+$"))
 
             # 注册分页导航回调处理程序
             self.application.add_handler(CallbackQueryHandler(
-                handle_page_navigation, pattern=r"^page_\d+$"))
+                handle_page_navigation, pattern=r"^a?page_\d+$"))
 
             # 注册消息删除回调处理程序
             self.application.add_handler(CallbackQueryHandler(
-                handle_message_delete, pattern=r"^delete_\d+$"))
+                handle_message_delete, pattern=r"^a?delete_\d+$"))
 
             # 注册消息处理程序
             self.application.add_handler(MessageHandler(
@@ -83,6 +130,9 @@ class TelegramBot:
                 handle_message
             ))
 
+            # 在最后一组统计处理完成的更新，用于按更新数量停止性能分析
+            self.application.add_handler(TypeHandler(Update, self.profiler.count_update), group=100)
+
             # 启动机器人
             self.application.initialize()
             self.application.start()
@@ -92,7 +142,7 @@ class TelegramBot:
             # 运行直到收到停止信号
             self.application.run_polling(
                 drop_pending_updates=True,
-                poll_interval=1.0,
+                poll_interval=POLL_INTERVAL,
                 allowed_updates=[Update.MESSAGE, Update.CALLBACK_QUERY]
             )
 
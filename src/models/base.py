@@ -1,13 +1,17 @@
 from pathlib import Path
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
+from utils.slow_query import install_slow_query_log
 
 Base = declarative_base()
 
 
-def init_db(database_url: str):
-    """初始化数据库"""
+def init_db(database_url: str, slow_query_threshold_ms: float = 0, slow_query_log_file: str = None):
+    """初始化数据库
+
+    slow_query_threshold_ms 大于 0 时记录超过该阈值的慢查询
+    """
     # 确保数据库目录存在
     db_path = Path(database_url.replace('sqlite:///', ''))
     db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -19,9 +23,30 @@ def init_db(database_url: str):
         pool_pre_ping=True,
     )
 
+    # 记录慢查询
+    if slow_query_threshold_ms > 0:
+        install_slow_query_log(engine, slow_query_threshold_ms, slow_query_log_file)
+
     # 创建表
     Base.metadata.create_all(engine)
 
+    # 为已存在的表补建新增的可空列
+    existing_columns = {
+        table_name: {column["name"] for column in inspect(engine).get_columns(table_name)}
+        for table_name in Base.metadata.tables
+    }
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if column.name not in existing_columns[table.name] and column.nullable:
+                    column_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+    # 为已存在的表补建新增的索引
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
     # 创建会话工厂
     session_maker = sessionmaker(
         engine,
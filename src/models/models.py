@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, LargeBinary, Index
+from sqlalchemy.orm import deferred
 from models.base import Base
 
 class User(Base):
@@ -22,10 +23,54 @@ class Message(Base):
     chat_id = Column(Integer, nullable=False)
     message_type = Column(String(50), nullable=False)
     text = Column(Text)
-    tokens = Column(Text)  # 分词后的文本，以空格分隔
+    tokens = deferred(Column(Text))  # 分词后的文本，以空格分隔，仅在需要时加载
     file_id = Column(String(255))  # 如果是媒体消息，存储文件ID
     forwarded_message_id = Column(Integer)  # 转发到目标群组后的消息ID
     created_at = Column(DateTime, default=datetime.utcnow)
+    restored_at = Column(DateTime)  # 从归档恢复的时间，恢复后的保留期内不会自动归档
     
+    __table_args__ = (
+        # 搜索按用户、类型和时间过滤
+        Index('ix_messages_user_created', 'user_id', 'created_at'),
+        Index('ix_messages_user_type_created', 'user_id', 'message_type', 'created_at'),
+    )
+
     def __repr__(self):
-        return f"<Message(id={self.id}, user_id={self.user_id})>" 
\ No newline at end of file
+        return f"<Message(id={self.id}, user_id={self.user_id})>"
+
+class ArchivedMessage(Base):
+    """冷存储中的归档消息，正文经过压缩，只追加写入"""
+    __tablename__ = 'archived_messages'
+
+    id = Column(Integer, primary_key=True)
+    original_id = Column(Integer, nullable=False)  # 归档前在 messages 表中的ID
+    message_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.telegram_id'), nullable=False)
+    chat_id = Column(Integer, nullable=False)
+    message_type = Column(String(50), nullable=False)
+    text_data = Column(LargeBinary)  # zlib 压缩后的消息文本
+    preview = Column(Text)  # 未压缩的文本开头，搜索结果列表无需解压 text_data
+    tokens = deferred(Column(Text))  # 去重后的分词结果，以空格分隔，仅在需要时加载
+    file_id = Column(String(255))
+    forwarded_message_id = Column(Integer)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_archived_messages_user_created', 'user_id', 'created_at'),
+        Index('ix_archived_messages_user_type_created', 'user_id', 'message_type', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<ArchivedMessage(id={self.id}, user_id={self.user_id})>"
+
+class ReindexState(Base):
+    """重新分词任务的进度检查点"""
+    __tablename__ = 'reindex_state'
+
+    table_name = Column(String(50), primary_key=True)  # 正在重新分词的表
+    last_id = Column(Integer, nullable=False, default=0)  # 已处理的最大主键
+    processed = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
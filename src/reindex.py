@@ -0,0 +1,42 @@
+import argparse
+import logging
+from config import DATABASE_URL
+from models.base import init_db
+from utils.reindex_utils import reindex_messages, REINDEX_CHUNK_SIZE
+
+# 配置日志
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """重新分词的命令行工具
+
+    用法：
+        python src/reindex.py [--restart] [--chunk-size 数量] [--workers 进程数]
+    """
+    parser = argparse.ArgumentParser(description="使用当前分词规则重新生成消息分词")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，从头开始")
+    parser.add_argument("--chunk-size", type=int, default=REINDEX_CHUNK_SIZE, help="每批处理的消息数量")
+    parser.add_argument("--workers", type=int, default=None, help="分词进程数，默认为 CPU 核数")
+    args = parser.parse_args()
+
+    engine, session_maker = init_db(DATABASE_URL)
+    try:
+        count = reindex_messages(
+            session_maker,
+            restart=args.restart,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            progress_callback=lambda progress: logger.info(str(progress))
+        )
+        logger.info(f"重新分词完成，共处理 {count} 条消息")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import threading
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func, or_
+from sqlalchemy.orm import undefer
+from models.models import Message, ArchivedMessage
+
+logger = logging.getLogger(__name__)
+
+# 每批归档/恢复的消息数量
+ARCHIVE_BATCH_SIZE = 500
+
+# 搜索结果中消息预览的最大长度
+PREVIEW_LENGTH = 100
+
+# 预览的原始文本长度，清理空白字符后文本会变短，因此多取一些字符；
+# 热存储在 SQL 中按该长度截断，归档时按该长度保存未压缩的预览
+PREVIEW_SOURCE_LENGTH = PREVIEW_LENGTH * 2
+
+
+def compress_text(text: str) -> bytes:
+    """压缩消息文本"""
+    if not text:
+        return None
+    return zlib.compress(text.encode('utf-8'))
+
+
+def decompress_text(data: bytes) -> str:
+    """解压消息文本"""
+    if not data:
+        return None
+    return zlib.decompress(data).decode('utf-8')
+
+
+def compact_tokens(tokens: str) -> str:
+    """去除重复和空白分词，得到紧凑的分词结果"""
+    if not tokens:
+        return ""
+    return " ".join(sorted(set(tokens.split())))
+
+
+def archive_messages(sessionmaker, days: int, batch_size: int = ARCHIVE_BATCH_SIZE,
+                     stop_event: threading.Event = None) -> int:
+    """
+    将早于指定天数的消息移动到归档表，恢复不足指定天数的消息除外
+    :param sessionmaker: 数据库会话工厂
+    :param days: 消息保留在热存储中的天数
+    :param batch_size: 每个事务处理的消息数量
+    :param stop_event: 设置后在当前批次完成后停止
+    :return: 归档的消息数量
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived_count = 0
+    last_id = 0
+
+    while stop_event is None or not stop_event.is_set():
+        # 每批使用独立的短事务，避免长时间锁表；
+        # 按主键顺序向后推进，每批只扫描上一批之后的行
+        with sessionmaker.begin() as session:
+            messages = session.execute(
+                select(Message)
+                .options(undefer(Message.tokens))
+                .where(Message.id > last_id)
+                .where(Message.created_at < cutoff)
+                # 恢复的消息在恢复后同样保留指定天数，之后重新参与归档
+                .where(or_(Message.restored_at.is_(None), Message.restored_at < cutoff))
+                .order_by(Message.id)
+                .limit(batch_size)
+            ).scalars().all()
+
+            if not messages:
+                break
+            last_id = messages[-1].id
+
+            session.add_all([
+                ArchivedMessage(
+                    original_id=msg.id,
+                    message_id=msg.message_id,
+                    user_id=msg.user_id,
+                    chat_id=msg.chat_id,
+                    message_type=msg.message_type,
+                    text_data=compress_text(msg.text),
+                    preview=msg.text[:PREVIEW_SOURCE_LENGTH] if msg.text else None,
+                    tokens=compact_tokens(msg.tokens),
+                    file_id=msg.file_id,
+                    forwarded_message_id=msg.forwarded_message_id,
+                    created_at=msg.created_at,
+                    archived_at=datetime.utcnow()
+                )
+                for msg in messages
+            ])
+            session.execute(
+                delete(Message).where(Message.id.in_([msg.id for msg in messages]))
+            )
+            archived_count += len(messages)
+
+    return archived_count
+
+
+def restore_messages(sessionmaker, user_id: int = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    将归档消息恢复到热存储
+
+    原ID未被占用时沿用原ID，已发出的查看/删除按钮仍然有效；
+    恢复的消息会被标记，在恢复后的保留期内不会被自动归档
+    :param sessionmaker: 数据库会话工厂
+    :param user_id: 只恢复指定用户的消息，为空时恢复全部
+    :param batch_size: 每个事务处理的消息数量
+    :return: 恢复的消息数量
+    """
+    restored_count = 0
+    restored_at = datetime.utcnow()
+
+    # 第一遍只恢复原ID未被占用的消息，第二遍为其余消息分配新ID，
+    # 避免新分配的ID占用后续批次的原ID
+    for keep_id in (True, False):
+        last_id = 0
+        while True:
+            with sessionmaker.begin() as session:
+                stmt = (
+                    select(ArchivedMessage)
+                    .options(undefer(ArchivedMessage.tokens))
+                    .where(ArchivedMessage.id > last_id)
+                    .order_by(ArchivedMessage.id)
+                    .limit(batch_size)
+                )
+                if user_id is not None:
+                    stmt = stmt.where(ArchivedMessage.user_id == user_id)
+                archived = session.execute(stmt).scalars().all()
+
+                if not archived:
+                    break
+                last_id = archived[-1].id
+
+                if keep_id:
+                    taken_ids = set(session.execute(
+                        select(Message.id).where(Message.id.in_([msg.original_id for msg in archived]))
+                    ).scalars())
+                    archived = [msg for msg in archived if msg.original_id not in taken_ids]
+
+                session.add_all([
+                    Message(
+                        id=msg.original_id if keep_id else None,
+                        message_id=msg.message_id,
+                        user_id=msg.user_id,
+                        chat_id=msg.chat_id,
+                        message_type=msg.message_type,
+                        text=decompress_text(msg.text_data),
+                        tokens=msg.tokens,
+                        file_id=msg.file_id,
+                        forwarded_message_id=msg.forwarded_message_id,
+                        created_at=msg.created_at,
+                        restored_at=restored_at
+                    )
+                    for msg in archived
+                ])
+                session.execute(
+                    delete(ArchivedMessage).where(ArchivedMessage.id.in_([msg.id for msg in archived]))
+                )
+                restored_count += len(archived)
+
+    return restored_count
+
+
+def get_archived_stats(session, user_id: int):
+    """
+    获取用户归档消息的统计信息
+    :return: (各类型消息数量, 最早消息时间, 最新消息时间)
+    """
+    type_counts = dict(session.execute(
+        select(ArchivedMessage.message_type, func.count(ArchivedMessage.id))
+        .where(ArchivedMessage.user_id == user_id)
+        .group_by(ArchivedMessage.message_type)
+    ).all())
+
+    first_at, last_at = session.execute(
+        select(func.min(ArchivedMessage.created_at), func.max(ArchivedMessage.created_at))
+        .where(ArchivedMessage.user_id == user_id)
+    ).one()
+
+    return type_counts, first_at, last_at
+
+
+async def archive_loop(sessionmaker, days: int, interval_hours: float):
+    """定期执行归档任务，取消时等待当前批次的事务完成后退出"""
+    stop_event = threading.Event()
+    while True:
+        task = asyncio.ensure_future(asyncio.to_thread(
+            archive_messages, sessionmaker, days, stop_event=stop_event
+        ))
+        try:
+            count = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            stop_event.set()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        except Exception as e:
+            logger.error(f"归档任务失败: {e}")
+        else:
+            if count:
+                logger.info(f"归档任务完成，共归档 {count} 条消息")
+        await asyncio.sleep(interval_hours * 3600)
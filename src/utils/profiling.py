@@ -0,0 +1,102 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+from datetime import datetime
+from pathlib import Path
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+# 文本摘要中显示的函数数量
+SUMMARY_LINES = 40
+
+
+class UpdateProfiler:
+    """
+    按需开启的 cProfile 性能分析
+
+    在处理接下来的 N 个更新或 T 秒后自动停止，结果保存为 .prof 文件和文本摘要。
+    只采集事件循环所在线程，asyncio.to_thread 中执行的任务不在统计范围内
+    """
+
+    def __init__(self, profile_dir: str):
+        self.profile_dir = Path(profile_dir)
+        self._profile = None
+        self._remaining_updates = None
+        self._after_update_id = None
+        self._timer = None
+        self._on_finish = None
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self, updates: int = None, seconds: float = None, on_finish=None,
+              after_update_id: int = None) -> bool:
+        """
+        开始性能分析
+        :param updates: 处理完该数量的更新后停止
+        :param seconds: 经过该秒数后停止
+        :param on_finish: 停止后调用的协程函数，参数为结果文件路径
+        :param after_update_id: 只统计ID大于该值的更新，用于排除触发分析的更新
+        :return: 是否成功开始，已在运行时返回 False
+        """
+        if self.running:
+            return False
+
+        self._remaining_updates = updates
+        self._after_update_id = after_update_id
+        self._on_finish = on_finish
+        if seconds:
+            self._timer = asyncio.get_running_loop().call_later(seconds, self.stop)
+
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        logger.info(f"性能分析已开始 (updates={updates}, seconds={seconds})")
+        return True
+
+    def stop(self) -> Path:
+        """停止性能分析并保存结果，返回 .prof 文件路径"""
+        if not self.running:
+            return None
+
+        profile, self._profile = self._profile, None
+        profile.disable()
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.prof"
+        profile.dump_stats(str(path))
+
+        # 同时保存按累计耗时排序的文本摘要
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+        path.with_suffix(".txt").write_text(summary.getvalue(), encoding="utf-8")
+        logger.info(f"性能分析已保存: {path}")
+
+        on_finish, self._on_finish = self._on_finish, None
+        if on_finish:
+            asyncio.get_running_loop().create_task(on_finish(path))
+        return path
+
+    def toggle(self, seconds: float):
+        """开始或停止性能分析，用于信号处理"""
+        if self.running:
+            self.stop()
+        else:
+            self.start(seconds=seconds)
+
+    async def count_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """每个更新处理完成后调用，用于按更新数量停止"""
+        if not self.running or self._remaining_updates is None:
+            return
+        if self._after_update_id is not None and update.update_id <= self._after_update_id:
+            return
+        self._remaining_updates -= 1
+        if self._remaining_updates <= 0:
+            self.stop()
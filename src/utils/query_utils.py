@@ -0,0 +1,109 @@
+from datetime import datetime
+from sqlalchemy import or_
+from utils.text_utils import tokenize_text
+
+# type: 过滤支持的消息类型及别名
+MESSAGE_TYPE_ALIASES = {
+    "text": "text",
+    "photo": "photo",
+    "image": "photo",
+    "video": "video",
+    "document": "document",
+    "doc": "document",
+    "file": "document",
+    "voice": "voice",
+    "audio": "voice",
+}
+
+# has: 过滤支持的条件
+HAS_VALUES = {"file"}
+
+
+class SearchQuery:
+    """解析后的搜索条件"""
+
+    def __init__(self, text: str = ""):
+        self.text = text  # 原始搜索语句，用于提示信息
+        self.keywords = []
+        self.message_types = []
+        self.after = None
+        self.before = None
+        self.has_file = False
+
+
+def _parse_date(value: str, operator: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{operator}: 日期格式错误，应为 YYYY-MM-DD")
+
+
+def parse_search_query(query: str) -> SearchQuery:
+    """
+    解析搜索语句，支持以下过滤条件：
+        type:photo          按消息类型过滤，可重复指定
+        after:2024-01-01    只包含该日期（含）之后的消息
+        before:2024-02-01   只包含该日期之前的消息
+        has:file            只包含带文件的消息
+    其余部分作为关键词
+    :param query: 搜索语句
+    :return: 解析后的搜索条件
+    """
+    parsed = SearchQuery(query or "")
+    if not query:
+        return parsed
+
+    for part in query.split():
+        operator, sep, value = part.partition(":")
+        operator = operator.lower()
+        if not sep or not value or operator not in ("type", "after", "before", "has"):
+            parsed.keywords.append(part)
+            continue
+
+        value = value.lower()
+        if operator == "type":
+            if value not in MESSAGE_TYPE_ALIASES:
+                raise ValueError(f"type: 不支持的消息类型 '{value}'")
+            message_type = MESSAGE_TYPE_ALIASES[value]
+            if message_type not in parsed.message_types:
+                parsed.message_types.append(message_type)
+        elif operator == "after":
+            parsed.after = _parse_date(value, operator)
+        elif operator == "before":
+            parsed.before = _parse_date(value, operator)
+        elif operator == "has":
+            if value not in HAS_VALUES:
+                raise ValueError(f"has: 不支持的条件 '{value}'")
+            parsed.has_file = True
+
+    return parsed
+
+
+def build_search_conditions(model, parsed: SearchQuery) -> list:
+    """
+    将搜索条件编译为查询条件
+    过滤条件作用于 message_type 和 created_at，可以使用 (user_id, message_type, created_at) 复合索引
+    :param model: Message 或 ArchivedMessage
+    :param parsed: 解析后的搜索条件
+    :return: 查询条件列表
+    """
+    conditions = []
+
+    if len(parsed.message_types) == 1:
+        conditions.append(model.message_type == parsed.message_types[0])
+    elif parsed.message_types:
+        conditions.append(model.message_type.in_(parsed.message_types))
+    if parsed.after:
+        conditions.append(model.created_at >= parsed.after)
+    if parsed.before:
+        conditions.append(model.created_at < parsed.before)
+    if parsed.has_file:
+        conditions.append(model.file_id.isnot(None))
+
+    # 关键词匹配
+    if parsed.keywords:
+        search_words = tokenize_text(" ".join(parsed.keywords)).split()
+        if search_words:
+            conditions.append(or_(*[model.tokens.contains(word) for word in search_words]))
+
+    return conditions
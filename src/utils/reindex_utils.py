@@ -0,0 +1,158 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import select, update, func, bindparam
+from models.models import Message, ArchivedMessage, ReindexState
+from utils.archive_utils import decompress_text, compact_tokens
+from utils.text_utils import tokenize_text
+
+logger = logging.getLogger(__name__)
+
+# 每批重新分词的消息数量
+REINDEX_CHUNK_SIZE = 500
+
+
+class ReindexProgress:
+    """重新分词任务的进度"""
+
+    def __init__(self, table_name: str, total: int, processed: int = 0):
+        self.table_name = table_name
+        self.total = total
+        self.processed = processed
+        self.started = time.monotonic()
+        self.done = 0  # 本次运行处理的数量，用于计算速度
+
+    @property
+    def rate(self) -> float:
+        """每秒处理的消息数"""
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float:
+        """预计剩余秒数"""
+        remaining = max(self.total - self.done, 0)
+        return remaining / self.rate if self.rate > 0 else None
+
+    def __str__(self):
+        eta = f"{self.eta:.0f}s" if self.eta is not None else "未知"
+        return (f"{self.table_name}: {self.done}/{self.total}，"
+                f"{self.rate:.1f} 条/秒，预计剩余 {eta}")
+
+
+def _tokenize_archived(text_data: bytes) -> str:
+    return compact_tokens(tokenize_text(decompress_text(text_data)))
+
+
+def _load_state(sessionmaker, table_name: str, reset: bool) -> ReindexState:
+    """读取检查点，reset 为 True 时重置进度"""
+    with sessionmaker.begin() as session:
+        state = session.get(ReindexState, table_name)
+        if state is None:
+            state = ReindexState(table_name=table_name)
+            session.add(state)
+            reset = True
+        if reset:
+            state.last_id = 0
+            state.processed = 0
+            state.started_at = datetime.utcnow()
+            state.finished_at = None
+        state.updated_at = datetime.utcnow()
+    return state
+
+
+def _reindex_table(sessionmaker, executor, model, text_column, tokenize, reset: bool,
+                   chunk_size: int, progress_callback) -> int:
+    table_name = model.__tablename__
+    state = _load_state(sessionmaker, table_name, reset)
+    if state.finished_at is not None:
+        logger.info(f"{table_name} 已在本轮完成重新分词，跳过")
+        return 0
+    last_id = state.last_id
+
+    with sessionmaker() as session:
+        total = session.execute(
+            select(func.count(model.id)).where(model.id > last_id)
+        ).scalar()
+    progress = ReindexProgress(table_name, total, state.processed)
+    if last_id:
+        logger.info(f"{table_name} 从检查点 id={last_id} 继续重新分词")
+
+    while True:
+        # 按主键分块读取
+        with sessionmaker() as session:
+            rows = session.execute(
+                select(model.id, text_column)
+                .where(model.id > last_id)
+                .order_by(model.id)
+                .limit(chunk_size)
+            ).all()
+
+        if not rows:
+            break
+
+        ids = [row[0] for row in rows]
+        texts = [row[1] for row in rows]
+        tokens = list(executor.map(tokenize, texts, chunksize=max(len(texts) // 8, 1)))
+
+        # 每批使用独立的短事务写入，并同时更新检查点；
+        # 使用 Core executemany，读取后被删除或归档的行直接跳过
+        table = model.__table__
+        with sessionmaker.begin() as session:
+            session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(tokens=bindparam("b_tokens")),
+                [{"b_id": msg_id, "b_tokens": msg_tokens} for msg_id, msg_tokens in zip(ids, tokens)]
+            )
+            state = session.get(ReindexState, table_name)
+            state.last_id = ids[-1]
+            state.processed += len(ids)
+            state.updated_at = datetime.utcnow()
+
+        last_id = ids[-1]
+        progress.processed += len(ids)
+        progress.done += len(ids)
+        if progress_callback:
+            progress_callback(progress)
+
+    with sessionmaker.begin() as session:
+        state = session.get(ReindexState, table_name)
+        state.finished_at = datetime.utcnow()
+
+    return progress.done
+
+
+def reindex_messages(sessionmaker, restart: bool = False, chunk_size: int = REINDEX_CHUNK_SIZE,
+                     workers: int = None, progress_callback=None, mp_context=None) -> int:
+    """
+    使用当前的分词规则重新生成所有消息（包括归档消息）的分词结果
+    任务可中断，再次运行时从检查点继续
+    :param sessionmaker: 数据库会话工厂
+    :param restart: 忽略检查点，从头开始
+    :param chunk_size: 每批处理的消息数量
+    :param workers: 分词进程数，默认为 CPU 核数
+    :param progress_callback: 每批完成后调用，参数为 ReindexProgress
+    :param mp_context: 创建分词进程使用的 multiprocessing 上下文，默认为平台默认方式
+    :return: 本次处理的消息数量
+    """
+    tables = [
+        (Message, Message.text, tokenize_text),
+        (ArchivedMessage, ArchivedMessage.text_data, _tokenize_archived),
+    ]
+
+    # 只有要求重新开始或上一轮所有表都已完成时才重置检查点，
+    # 否则中断后再次运行时跳过本轮已完成的表
+    with sessionmaker() as session:
+        states = [session.get(ReindexState, model.__tablename__) for model, _, _ in tables]
+    reset = restart or all(state is not None and state.finished_at is not None for state in states)
+
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        for model, text_column, tokenize in tables:
+            count += _reindex_table(sessionmaker, executor, model, text_column, tokenize,
+                                    reset, chunk_size, progress_callback)
+    return count
@@ -0,0 +1,74 @@
+import logging
+import time
+from sqlalchemy import event
+
+logger = logging.getLogger("slow_query")
+
+# 可以执行 EXPLAIN QUERY PLAN 的语句
+EXPLAIN_PREFIXES = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def _bind_shape(parameters, executemany: bool) -> str:
+    """描述绑定参数的结构，只记录类型不记录值"""
+    if executemany:
+        rows = list(parameters)
+        first = _bind_shape(rows[0], False) if rows else "()"
+        return f"{len(rows)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """获取 SQLite 的查询计划"""
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(EXPLAIN_PREFIXES):
+        return None
+    # 使用新的游标，避免覆盖原语句尚未读取的结果
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(f"  {row[-1]}" for row in cursor.fetchall())
+    except Exception as e:
+        return f"  无法获取查询计划: {e}"
+    finally:
+        cursor.close()
+
+
+def install_slow_query_log(engine, threshold_ms: float, log_file: str = None):
+    """
+    记录执行时间超过阈值的 SQL 语句
+    :param engine: 数据库引擎
+    :param threshold_ms: 慢查询阈值（毫秒）
+    :param log_file: 额外写入的日志文件
+    """
+    if log_file:
+        handler = logging.FileHandler(log_file, encoding="utf-8")
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        logger.addHandler(handler)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if duration_ms < threshold_ms:
+            return
+
+        message = (f"慢查询 {duration_ms:.1f}ms\n"
+                   f"SQL: {' '.join(statement.split())}\n"
+                   f"参数: {_bind_shape(parameters, executemany)}")
+        plan = None if executemany else _explain(conn, statement, parameters)
+        if plan:
+            message += f"\n查询计划:\n{plan}"
+        logger.warning(message)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
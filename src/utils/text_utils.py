@@ -1,4 +1,9 @@
 import jieba
+from config import JIEBA_USER_DICT
+
+# 加载自定义词典
+if JIEBA_USER_DICT:
+    jieba.load_userdict(JIEBA_USER_DICT)
 
 def tokenize_text(text: str) -> str:
     """
@@ -9,4 +14,4 @@ def tokenize_text(text: str) -> str:
     if not text:
         return ""
     words = jieba.cut(text)
-    return " ".join(words) 
\ No newline at end of file
+    return " ".join(words)
\ No newline at end of file
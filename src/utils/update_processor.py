@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from typing import Awaitable, Dict
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class _UserQueue:
+    """单个用户的更新队列状态"""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    并发处理不同用户的更新，同一用户的更新按到达顺序串行处理
+
+    - 全局最多同时处理 max_concurrent_updates 个更新
+    - 每个用户同时只处理一个更新，其余更新排队等待，不会被丢弃
+
+    基类在调用 do_process_update 前会先占用它的信号量，排队中的更新也会占用名额，
+    因此基类的信号量不做限制，全局并发由 do_process_update 中自己的信号量控制，
+    并且先等待该用户的前序更新完成再占用全局名额
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(sys.maxsize)
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._queues: Dict[int, _UserQueue] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        user_id = None
+        if isinstance(update, Update) and update.effective_user:
+            user_id = update.effective_user.id
+
+        # 无法确定用户的更新只受全局并发限制
+        if user_id is None:
+            async with self._running:
+                await coroutine
+            return
+
+        queue = self._queues.get(user_id)
+        if queue is None:
+            queue = self._queues[user_id] = _UserQueue()
+
+        queue.pending += 1
+        try:
+            async with queue.lock:
+                async with self._running:
+                    await coroutine
+        finally:
+            queue.pending -= 1
+            if queue.pending == 0:
+                self._queues.pop(user_id, None)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
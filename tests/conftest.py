@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 与运行机器人时一致，从 src 目录导入模块
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+import models.models  # noqa: F401  注册所有表
+from models.base import init_db
+from models.models import User, Message, ArchivedMessage
+from utils.archive_utils import compress_text
+from utils.reindex_utils import reindex_messages
+
+
+@pytest.fixture
+def sessionmaker(tmp_path):
+    engine, session_maker = init_db(f"sqlite:///{tmp_path / 'bot.db'}")
+    with session_maker.begin() as session:
+        session.add(User(telegram_id=1))
+        for i in range(1, 31):
+            session.add(Message(message_id=i, user_id=1, chat_id=1, message_type="text",
+                                text=f"测试消息 {i}", created_at=datetime.utcnow()))
+        for i in range(1, 11):
+            session.add(ArchivedMessage(original_id=100 + i, message_id=100 + i, user_id=1, chat_id=1,
+                                        message_type="text", text_data=compress_text(f"归档消息 {i}"),
+                                        created_at=datetime.utcnow()))
+    yield session_maker
+    engine.dispose()
+
+
+def test_resume_after_crash_in_second_table_skips_finished_table(sessionmaker):
+    def crash_in_archive(progress):
+        if progress.table_name == "archived_messages":
+            raise RuntimeError("crash")
+
+    with pytest.raises(RuntimeError):
+        reindex_messages(sessionmaker, chunk_size=5, workers=1, progress_callback=crash_in_archive)
+
+    processed = []
+    count = reindex_messages(sessionmaker, chunk_size=5, workers=1,
+                             progress_callback=lambda progress: processed.append(progress.table_name))
+
+    # messages 已完成，不再重新处理；archived_messages 从第一批之后继续
+    assert "messages" not in processed
+    assert count == 5
+
+
+def test_rerun_after_all_tables_finished_starts_new_round(sessionmaker):
+    assert reindex_messages(sessionmaker, chunk_size=5, workers=1) == 40
+    assert reindex_messages(sessionmaker, chunk_size=5, workers=1) == 40
+
+
+def test_restart_resets_finished_tables(sessionmaker):
+    def crash_in_archive(progress):
+        if progress.table_name == "archived_messages":
+            raise RuntimeError("crash")
+
+    with pytest.raises(RuntimeError):
+        reindex_messages(sessionmaker, chunk_size=5, workers=1, progress_callback=crash_in_archive)
+
+    assert reindex_messages(sessionmaker, restart=True, chunk_size=5, workers=1) == 40